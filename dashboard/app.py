@@ -1,13 +1,17 @@
 from flask import Flask, render_template
 from flask_socketio import SocketIO
 import csv
+import errno
 import os
+import select
 from collections import Counter, defaultdict
-from datetime import datetime
-import statistics
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
 import threading
 import time
 import socket
+import sys
 
 app = Flask(__name__)
 socketio = SocketIO(app, async_mode='threading', cors_allowed_origins="*")
@@ -15,6 +19,46 @@ socketio = SocketIO(app, async_mode='threading', cors_allowed_origins="*")
 _emitter_thread_started = False
 _emitter_lock = threading.Lock()
 
+# Running aggregates over metrics.csv, advanced by parsing only the bytes
+# appended since the last poll (the proxy only ever appends to the file)
+def _new_state():
+    return {
+        'offset': 0,
+        # Identity of the file the offset refers to: its inode and raw header line
+        'ino': None,
+        'header_line': None,
+        'header': None,
+        'idx': None,
+        'counter_domains': Counter(),
+        'req_per_min': defaultdict(int),
+        # minute -> [latency sum, latency count]
+        'latency_per_min': {},
+        'bw_per_domain': defaultdict(int),
+        'clients': set(),
+        'total_requests': 0,
+        'total_bw': 0,
+        'lat_sum': 0.0,
+        'lat_n': 0,
+        'blocked': 0,
+    }
+
+_state = _new_state()
+
+# Columns the aggregation reads; their positions are looked up once from the header
+_COLUMNS = ('timestamp', 'latency_ms', 'response_bytes', 'host', 'client_ip', 'blocked')
+# Index for a column absent from the header: never < len(row), so it reads as ''
+_MISSING_COLUMN = sys.maxsize
+# Running (sum, count) for a minute with no parseable latency values
+_NO_LATENCY = (0.0, 0)
+
+# Result of the last proxy liveness probe and when it was taken (monotonic)
+_proxy_active_cache = {'t': None, 'v': False}
+_PROXY_ACTIVE_TTL = 5
+
+# Last seen (path, mtime_ns, size) of metrics.csv and the stats built for it
+_CACHE = {'key': None, 'data': None, 'stats': None}
+_cache_lock = threading.Lock()
+
 
 # Helper to locate metrics file
 def get_metrics_path():
@@ -36,149 +80,274 @@ def get_metrics_path():
     return None
 
 def is_proxy_active():
+    # Probed at most once per TTL; the emitter and every page hit share the result
+    now = time.monotonic()
+    checked_at = _proxy_active_cache['t']
+    if checked_at is not None and now - checked_at < _PROXY_ACTIVE_TTL:
+        return _proxy_active_cache['v']
+
+    active = False
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     try:
-        with socket.create_connection(("127.0.0.1", 8080), timeout=1):
-            return True
-    except Exception:
-        return False
+        sock.setblocking(False)
+        err = sock.connect_ex(("127.0.0.1", 8080))
+        if err in (0, errno.EISCONN):
+            active = True
+        elif err in (errno.EINPROGRESS, errno.EWOULDBLOCK):
+            _, writable, _ = select.select([], [sock], [], 0.05)
+            active = bool(writable) and sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0
+    except OSError:
+        active = False
+    finally:
+        sock.close()
+
+    _proxy_active_cache['t'] = now
+    _proxy_active_cache['v'] = active
+    return active
 
 def parse_metrics():
+    global _state
     path = get_metrics_path()
     if not path or not os.path.exists(path):
         return None
 
-    data = []
     try:
-        with open(path, 'r', newline='') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                data.append(row)
-    except Exception as e:
+        st = os.stat(path)
+    except OSError as e:
         print(f"Error reading metrics: {e}")
         return None
-    return data
 
+    # Skip the read entirely while the file is unchanged
+    key = (path, st.st_ino, st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        if key == _CACHE['key']:
+            return _CACHE['data']
 
-def calculate_stats(data):
-    if not data:
-        stats = {
-            'total_requests': 0,
-            'blocked_requests': 0,
-            'avg_latency': 0,
-            'total_bandwidth': 0,
-            'unique_clients': 0,
-            'top_domains_labels': [],
-            'top_domains_data': [],
-            'requests_time_labels': [],
-            'requests_time_data': [],
-            'latency_time_data': [],
-            'bw_domains_labels': [],
-            'bw_domains_data': []
+        # Stream new rows straight from the file through the CSV reader into the
+        # aggregates in a single pass; nothing but the current line is buffered.
+        try:
+            with open(path, 'rb') as f:
+                # A different file (rotated or replaced), one that shrank, or one
+                # rewritten in place with a new header (the proxy migrating old
+                # columns on start): start over from the top
+                header_line = f.readline()
+                if (st.st_ino != _state['ino'] or st.st_size < _state['offset']
+                        or header_line != _state['header_line']):
+                    _state = _new_state()
+                    _state['ino'] = st.st_ino
+                    _state['header_line'] = header_line
+                f.seek(_state['offset'])
+                _ingest_lines(_state, _complete_lines(f, _state))
+        except Exception as e:
+            print(f"Error reading metrics: {e}")
+            return None
+
+        _CACHE['key'] = key
+        _CACHE['data'] = _state
+        _CACHE['stats'] = None
+        return _state
+
+
+def _complete_lines(f, state):
+    """Yield complete lines from f, advancing the saved offset past each one.
+
+    A trailing line without a newline is a row still being written; it is left
+    for the next poll.
+    """
+    for raw in f:
+        if not raw.endswith(b'\n'):
+            return
+        state['offset'] += len(raw)
+        yield raw.decode('utf-8', errors='replace')
+
+
+def _ingest_lines(state, lines):
+    """Parse CSV lines and fold them into the aggregates."""
+    rows = csv.reader(lines)
+    if state['header'] is None:
+        header = next(rows, None)
+        if header is None:
+            return
+        state['header'] = header
+        state['idx'] = {
+            name: header.index(name) if name in header else _MISSING_COLUMN
+            for name in _COLUMNS
         }
-        socketio.emit('metrics_update', stats)
-        return stats
+    _ingest_rows(state, rows)
+
+
+@lru_cache(maxsize=4096)
+def _minute_key(ts_str):
+    """Return the "%Y-%m-%d %H:%M" bucket for a metrics timestamp, or None.
+
+    Accepts the proxy's "YYYY-mm-dd HH:MM:SS" as well as the older
+    "dd-mm-YYYY  HH:MM:SS" (one or two spaces). Both are fixed-width, so the
+    fields are sliced out directly instead of going through strptime, and the
+    ISO-ordered key sorts chronologically as a plain string. Callers pass only
+    the first 17 characters (date and HH:MM) so that every row within the same
+    minute hits the cache.
+    """
+    if ts_str[4:5] == '-':
+        if ts_str[7:8] != '-' or ts_str[10:11] != ' ':
+            return None
+        year, month, day = ts_str[0:4], ts_str[5:7], ts_str[8:10]
+        clock = ts_str[11:16]
+    elif ts_str[2:3] == '-' and ts_str[5:6] == '-':
+        day, month, year = ts_str[0:2], ts_str[3:5], ts_str[6:10]
+        if ts_str[10:12] == '  ':
+            clock = ts_str[12:17]
+        elif ts_str[10:11] == ' ':
+            clock = ts_str[11:16]
+        else:
+            return None
+    else:
+        return None
 
-    total_requests = len(data)
-    # Blocked requests are not logged in metrics.csv currently
-    blocked_requests = 0
-    
-    for row in data:
-        if str(row.get("blocked", "0")).strip() == "1":
-            blocked_requests += 1
-
-    
-    latencies = []
-    bandwidth = 0
-    clients = set()
-    domains = []
-
-    # Time series data
-    req_per_min = defaultdict(int)
-    latency_per_min = defaultdict(list)
-    bandwidth_per_domain = defaultdict(int)
-
-    for row in data:
-        minute_key = None
-        ts_str = (row.get('timestamp') or '').strip()
-        if ts_str:
-            try:
-                dt = datetime.strptime(ts_str, "%d-%m-%Y  %H:%M:%S")
-            except ValueError:
+    digits = year + month + day + clock[:2] + clock[3:]
+    if clock[2:3] != ':' or len(digits) != 12 or not digits.isdigit():
+        return None
+    return f"{year}-{month}-{day} {clock}"
+
+
+def _ingest_rows(state, rows):
+    """Fold new metrics rows into the running aggregates.
+
+    Rows are appended in time order, so consecutive rows share a minute bucket:
+    each run is aggregated locally and merged into the running totals once,
+    with its host/client columns counted in bulk by Counter/set updates.
+    """
+    idx = state['idx']
+    i_ts = idx['timestamp']
+    i_lat = idx['latency_ms']
+    i_bw = idx['response_bytes']
+    i_host = idx['host']
+    i_client = idx['client_ip']
+    i_blocked = idx['blocked']
+
+    # Fast path: for a row carrying every column, one C-level itemgetter call
+    # pulls all the fields instead of six bounds-checked subscripts
+    columns = (i_ts, i_lat, i_bw, i_host, i_client, i_blocked)
+    full_width = max(columns) + 1
+    pick = itemgetter(*columns)
+
+    def pick_fields(row):
+        n = len(row)
+        if n >= full_width:
+            return pick(row)
+        return tuple(row[i] if i < n else '' for i in columns)
+
+    bw_per_domain = state['bw_per_domain']
+    counter_domains = state['counter_domains']
+    unique_clients = state['clients']
+    hosts = []
+    clients = []
+    hosts_append = hosts.append
+    clients_append = clients.append
+    # csv hands back a fresh str per field; interning collapses repeats of the
+    # same host/client to one object so dict and set lookups hit on identity
+    intern = sys.intern
+
+    def row_minute(fields):
+        return _minute_key(fields[0].strip()[:17])
+
+    fields_iter = map(pick_fields, filter(None, rows))
+    for minute_key, group in groupby(fields_iter, key=row_minute):
+        run_requests = 0
+        run_blocked = 0
+        run_lat_sum = 0.0
+        run_lat_n = 0
+        run_bw = 0
+
+        for _ts, lat_str, bw_str, host, client, blocked in group:
+            run_requests += 1
+            if blocked.strip() == "1":
+                run_blocked += 1
+
+            host = host.strip()
+            if host:
+                host = intern(host)
+
+            # Latency
+            lat_str = lat_str.strip()
+            if lat_str:
                 try:
-                    dt = datetime.strptime(ts_str.replace("  ", " "), "%d-%m-%Y %H:%M:%S")
+                    run_lat_sum += float(lat_str)
+                    run_lat_n += 1
                 except ValueError:
-                    dt = None
+                    pass
 
-            if dt:
-                minute_key = dt.strftime("%d-%m-%Y %H:%M")
-                req_per_min[minute_key] += 1
-
-
-        # Latency
-        try:
-            lat_str = (row.get('latency_ms') or '').strip()
-            if lat_str:
-                lat = float(lat_str)
-                latencies.append(lat)
-                if minute_key:
-                    latency_per_min[minute_key].append(lat)
-        except ValueError:
-            pass
-
-        # Bandwidth
-        try:
-            bw_str = (row.get('response_bytes') or '').strip()
+            # Bandwidth
+            bw_str = bw_str.strip()
             if bw_str:
-                b = int(float(bw_str))
-                bandwidth += b
-                
-                h = (row.get('host') or '').strip()
-                if h:
-                    bandwidth_per_domain[h] += b
-        except ValueError:
-            pass
-
-        # Client
-        client = (row.get('client_ip') or '').strip()
-        if client:
-            clients.add(client)
-
-        # Host
-        host = (row.get('host') or '').strip()
-        if host:
-            domains.append(host)
-
-    avg_latency = statistics.mean(latencies) if latencies else 0
+                try:
+                    b = int(float(bw_str))
+                except ValueError:
+                    pass
+                else:
+                    run_bw += b
+                    if host:
+                        bw_per_domain[host] += b
+
+            # Client
+            client = client.strip()
+            if client:
+                clients_append(intern(client))
+
+            # Host
+            if host:
+                hosts_append(host)
+
+        counter_domains.update(hosts)
+        unique_clients.update(clients)
+        hosts.clear()
+        clients.clear()
+
+        state['total_requests'] += run_requests
+        state['blocked'] += run_blocked
+        state['lat_sum'] += run_lat_sum
+        state['lat_n'] += run_lat_n
+        state['total_bw'] += run_bw
+        if minute_key:
+            state['req_per_min'][minute_key] += run_requests
+            if run_lat_n:
+                pair = state['latency_per_min'].get(minute_key)
+                if pair is None:
+                    state['latency_per_min'][minute_key] = [run_lat_sum, run_lat_n]
+                else:
+                    pair[0] += run_lat_sum
+                    pair[1] += run_lat_n
+
+
+def _snapshot_stats(state):
+    """Build the dashboard payload from the running aggregates."""
+    avg_latency = state['lat_sum'] / state['lat_n'] if state['lat_n'] else 0
 
     # Top domains
-    domain_counts = Counter(domains)
-    top_domains = domain_counts.most_common(5)
+    top_domains = state['counter_domains'].most_common(5)
 
     # Format time series for charts
-    sorted_mins = sorted(
-        req_per_min.keys(),
-        key=lambda m: datetime.strptime(m, "%d-%m-%Y %H:%M") if m else datetime.min
-    )
-
-
+    req_per_min = state['req_per_min']
+    # ISO "YYYY-mm-dd HH:MM" keys sort chronologically as strings
+    sorted_mins = sorted(req_per_min)
 
     requests_time_labels = sorted_mins
     requests_time_data = [req_per_min[k] for k in sorted_mins]
 
+    latency_per_min = state['latency_per_min']
     latency_time_data = []
     for k in sorted_mins:
-        lats = latency_per_min[k]
-        latency_time_data.append(statistics.mean(lats) if lats else 0)
+        lat_sum, lat_n = latency_per_min.get(k, _NO_LATENCY)
+        latency_time_data.append(lat_sum / lat_n if lat_n else 0)
 
     # Top 5 bandwidth domains
-    top_bw_domains = sorted(bandwidth_per_domain.items(), key=lambda x: x[1], reverse=True)[:5]
+    top_bw_domains = sorted(state['bw_per_domain'].items(), key=lambda x: x[1], reverse=True)[:5]
 
-    stats = {
-        'total_requests': total_requests,
-        'blocked_requests': blocked_requests,
+    return {
+        'total_requests': state['total_requests'],
+        'blocked_requests': state['blocked'],
         'avg_latency': round(avg_latency, 2),
-        'total_bandwidth': round(bandwidth / (1024 * 1024), 2),  # MB
-        'unique_clients': len(clients),
+        'total_bandwidth': round(state['total_bw'] / (1024 * 1024), 2),  # MB
+        'unique_clients': len(state['clients']),
         'top_domains_labels': [d[0] for d in top_domains],
         'top_domains_data': [d[1] for d in top_domains],
         'requests_time_labels': requests_time_labels,
@@ -186,16 +355,53 @@ def calculate_stats(data):
         'latency_time_data': latency_time_data,
         'bw_domains_labels': [d[0] for d in top_bw_domains],
         'bw_domains_data': [round(d[1] / (1024 * 1024), 2) for d in top_bw_domains],
-        'proxy_active': is_proxy_active()
     }
 
+
+def calculate_stats(data):
+    if not data or not data['total_requests']:
+        stats = {
+            'total_requests': 0,
+            'blocked_requests': 0,
+            'avg_latency': 0,
+            'total_bandwidth': 0,
+            'unique_clients': 0,
+            'top_domains_labels': [],
+            'top_domains_data': [],
+            'requests_time_labels': [],
+            'requests_time_data': [],
+            'latency_time_data': [],
+            'bw_domains_labels': [],
+            'bw_domains_data': []
+        }
+        socketio.emit('metrics_update', stats)
+        return stats
+
+    with _cache_lock:
+        key = _CACHE['key']
+        cached = _CACHE['stats']
+        if cached is None:
+            stats = _snapshot_stats(data)
+
+    proxy_active = is_proxy_active()
+    if cached is not None:
+        # Nothing new since the last snapshot: only emit if the proxy status flipped
+        if proxy_active == cached['proxy_active']:
+            return cached
+        stats = dict(cached)
+    stats['proxy_active'] = proxy_active
+
+    with _cache_lock:
+        if _CACHE['key'] == key:
+            _CACHE['stats'] = stats
+
     # Emit latest computed stats for live dashboard updates.
     socketio.emit('metrics_update', stats)
     return stats
 
 
 def metrics_emitter_worker():
-    """Background worker that polls metrics and emits dashboard updates every 2 seconds."""
+    """Background worker that polls metrics every 2 seconds and emits dashboard updates on change."""
     while True:
         data = parse_metrics()
         calculate_stats(data)
@@ -1,55 +1,148 @@
 """Handle a single client connection and proxy HTTP requests."""
 
-import select
+import os
+import selectors
 import socket
+import threading
 import time
-from typing import Dict, Tuple
-from urllib.parse import urlsplit
+from typing import List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
 
 from filter_engine import FilterEngine
 from http_parser import (
+    build_client_response_head,
     build_forward_request,
+    has_header,
+    parse_content_length,
     parse_http_request,
+    parse_http_response_head,
     parse_target_from_request,
+    response_allows_reuse,
 )
 from logger import ProxyLogger
 from metrics import MetricsLogger
+from socket_wait import wait_for_socket
+from upstream_pool import UpstreamPool
+
+# Largest chunk moved per recv()/splice() call.
+_IO_CHUNK_SIZE = 65536
+# Capacity requested for splice() relay pipes (the default pipe holds only 64 KiB).
+_SPLICE_PIPE_SIZE = 1 << 20
+_F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", None)
+# Request headers larger than this are not waited on any further.
+_MAX_HEADER_SIZE = 65536
+# Initial request buffer per connection; typical request heads fit in one page
+# or two, and larger ones grow the buffer up to _MAX_HEADER_SIZE.
+_REQUEST_BUFFER_SIZE = 8192
+# Linux only; used to ACK pooled upstreams' response heads without delay.
+_TCP_QUICKACK = getattr(socket, "TCP_QUICKACK", None)
+# CONNECT tunnels given threads of their own at once; beyond this, a tunnel
+# stays on the worker that accepted it.
+_MAX_TUNNEL_THREADS = 1024
+_tunnel_slots = threading.BoundedSemaphore(_MAX_TUNNEL_THREADS)
+# Methods that may be sent again if a pooled connection dies under them
+# (RFC 9110, section 9.2.2); anything else always gets a fresh connection.
+_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "TRACE", "PUT", "DELETE"})
+
+# Canned error responses, encoded once; the 403 is sent as head + host + tail.
+_FORBIDDEN_HEAD = (
+    b"HTTP/1.1 403 Forbidden\r\n"
+    b"Content-Type: text/plain\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+    b"Access to "
+)
+_FORBIDDEN_TAIL = b" is blocked by proxy policy."
+_BAD_REQUEST_RESPONSE = (
+    b"HTTP/1.1 400 Bad Request\r\n"
+    b"Content-Type: text/plain\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+    b"Malformed request received by proxy."
+)
+_BAD_GATEWAY_RESPONSE = (
+    b"HTTP/1.1 502 Bad Gateway\r\n"
+    b"Content-Type: text/plain\r\n"
+    b"Connection: close\r\n"
+    b"\r\n"
+    b"Proxy could not reach the upstream server."
+)
+
+
+def _send_buffers(sock: socket.socket, buffers: List[bytes]) -> None:
+    """Send several buffers in order with a single gathering sendmsg() where
+    available, instead of concatenating them first."""
+    if not hasattr(sock, "sendmsg"):
+        sock.sendall(b"".join(buffers))
+        return
+    views = [memoryview(buffer) for buffer in buffers if buffer]
+    while views:
+        sent = sock.sendmsg(views)
+        # Drop what went out; a partial send resumes mid-buffer.
+        while views and sent >= len(views[0]):
+            sent -= len(views.pop(0))
+        if sent:
+            views[0] = views[0][sent:]
 
 
 class ClientHandler:
-    """Handles an individual client connection in its own thread."""
+    """Handles an individual client connection on one of the server's worker threads."""
 
     def __init__(
         self,
         client_socket: socket.socket,
         client_address: Tuple[str, int],
+        client_ip: bytes,
         filter_engine: FilterEngine,
         metrics_logger: MetricsLogger,
         logger: ProxyLogger,
+        upstream_pool: UpstreamPool,
     ) -> None:
         self.client_socket = client_socket
         self.client_address = client_address
+        self.client_ip = client_ip
         self.filter_engine = filter_engine
         self.metrics_logger = metrics_logger
         self.logger = logger
+        self.upstream_pool = upstream_pool
+        self._tunnel_detached = False
+        # Splice relay pipe as (read fd, write fd, capacity), once one is needed.
+        self._pipe: Optional[Tuple[int, int, int]] = None
 
     def handle(self) -> None:
         """Main entry point for processing a client request."""
         self.client_socket.settimeout(10)
         try:
-            request_data = self._recv_http_request()
-            if not request_data:
+            # Responses go out as a head write followed by the body; don't let
+            # Nagle delay the second write behind the client's delayed ACK.
+            self.client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            head, received_body = self._recv_request_head()
+            if not head:
                 return
 
-            request_line, headers, body = parse_http_request(request_data)
+            request_line, headers, _ = parse_http_request(head)
             if not request_line:
                 self._send_bad_request()
                 return
 
             method, url, version = request_line
 
+            # Request bodies are delimited by a single Content-Length only. A
+            # chunked body can't be told apart from whatever follows it, and an
+            # ambiguous length could leave bytes on a pooled upstream connection
+            # that the upstream reads as another, unfiltered request.
+            content_length = parse_content_length(headers)
+            if content_length is None or has_header(headers, b"transfer-encoding"):
+                self._send_bad_request()
+                return
+            body = self._recv_body(received_body, content_length)
+
             if method.upper() == "CONNECT":
-                self._handle_connect(request_data, method, url)
+                self._handle_connect(len(head) + 4 + len(body), method, url)
                 return
 
             target_host, target_port, path = parse_target_from_request(url, headers)
@@ -67,15 +160,7 @@ class ClientHandler:
                 self._log_blocked_request(method=method, url=url, host=target_host)
                 return
 
-            # Convert absolute-form request line to origin-form.
-            # Example: "GET http://neverssl.com/ HTTP/1.1" -> "GET / HTTP/1.1"
-            if path.lower().startswith("http://") or path.lower().startswith("https://"):
-                parsed = urlsplit(path)
-                path = parsed.path or "/"
-                if parsed.query:
-                    path = f"{path}?{parsed.query}"
-
-            forward_bytes = build_forward_request(
+            forward_parts = build_forward_request(
                 method=method,
                 path=path,
                 version=version,
@@ -85,7 +170,7 @@ class ClientHandler:
             self._proxy_request(
                 target_host=target_host,
                 target_port=target_port,
-                request_bytes=forward_bytes,
+                request_parts=forward_parts,
                 method=method,
                 url=url,
             )
@@ -94,70 +179,90 @@ class ClientHandler:
         except Exception as exc:
             self.logger.error("Client handling error: %s", exc)
         finally:
-            self.client_socket.close()
-
-    def _recv_http_request(self) -> bytes:
-        """Receive the full HTTP request from the client socket."""
-        buffer = bytearray()
-        while b"\r\n\r\n" not in buffer:
-            chunk = self.client_socket.recv(4096)
-            if not chunk:
-                return b""
-            buffer.extend(chunk)
-            if len(buffer) > 65536:
-                break
-
-        header_bytes, _, remaining = buffer.partition(b"\r\n\r\n")
-        headers_text = header_bytes.decode("iso-8859-1", errors="replace")
-        content_length = 0
-        for line in headers_text.split("\r\n")[1:]:
-            if line.lower().startswith("content-length:"):
-                try:
-                    content_length = int(line.split(":", 1)[1].strip())
-                except ValueError:
-                    content_length = 0
+            self._close_relay_pipe()
+            if not self._tunnel_detached:
+                self.client_socket.close()
+
+    def _recv_request_head(self) -> Tuple[bytes, bytearray]:
+        """Receive the request head from the client socket.
+
+        Returns (head without its terminating blank line, body bytes received
+        along with it); the head is empty if the client closed first.
+        """
+        # Headers are received straight into one preallocated buffer rather than
+        # allocating a bytes object per recv() and copying it into an accumulator.
+        buffer = bytearray(_REQUEST_BUFFER_SIZE)
+        received = 0
+        header_end = -1
+        while received < _MAX_HEADER_SIZE:
+            if received == len(buffer):
+                buffer.extend(bytes(min(received, _MAX_HEADER_SIZE - received)))
+            with memoryview(buffer) as view:
+                count = self.client_socket.recv_into(view[received:])
+            if not count:
+                return b"", bytearray()
+            # Only the new bytes (plus 3 for a terminator split across reads)
+            # need scanning; the earlier part of the buffer was already checked.
+            header_end = buffer.find(b"\r\n\r\n", max(received - 3, 0), received + count)
+            received += count
+            if header_end != -1:
                 break
 
-        body = remaining
-        while len(body) < content_length:
-            chunk = self.client_socket.recv(4096)
-            if not chunk:
-                break
-            body += chunk
-
-        return header_bytes + b"\r\n\r\n" + body
+        view = memoryview(buffer)
+        if header_end == -1:
+            return bytes(view[:received]), bytearray()
+        return bytes(view[:header_end]), bytearray(view[header_end + 4 : received])
+
+    def _recv_body(self, body: bytearray, content_length: int) -> bytearray:
+        """Complete a request body of `content_length` bytes, `body` being the part
+        already received with the head."""
+        if len(body) < content_length:
+            # The head buffer is usually only a few KiB; read the body in full
+            # _IO_CHUNK_SIZE pieces through a buffer of its own.
+            chunk = bytearray(min(content_length - len(body), _IO_CHUNK_SIZE))
+            chunk_view = memoryview(chunk)
+            while len(body) < content_length:
+                count = self.client_socket.recv_into(chunk)
+                if not count:
+                    break
+                body += chunk_view[:count]
+        # Anything past the declared body (e.g. a pipelined second request) is
+        # dropped: it has not been through the filter and must never reach the
+        # keep-alive upstream connection.
+        del body[content_length:]
+        return body
 
     def _proxy_request(
         self,
         target_host: str,
         target_port: int,
-        request_bytes: bytes,
+        request_parts: List[bytes],
         method: str,
         url: str,
     ) -> None:
         """Forward the HTTP request to the destination server and relay response."""
         start_time = time.time()
-        request_size = len(request_bytes)
+        request_size = sum(map(len, request_parts))
         response_size = 0
 
         try:
-            with socket.create_connection(
-                (target_host, target_port), timeout=10
-            ) as upstream_socket:
-                upstream_socket.sendall(request_bytes)
-                self.logger.info(
-                    "Forwarded %s request to %s:%s",
-                    method,
-                    target_host,
-                    target_port,
-                )
+            upstream_socket, head, buffered = self._exchange_with_upstream(
+                target_host, target_port, request_parts, method
+            )
+            self.logger.info(
+                "Forwarded %s request to %s:%s",
+                method,
+                target_host,
+                target_port,
+            )
 
-                while True:
-                    data = upstream_socket.recv(4096)
-                    if not data:
-                        break
-                    response_size += len(data)
-                    self.client_socket.sendall(data)
+            reusable = False
+            try:
+                response_size, reusable = self._relay_response(
+                    upstream_socket, method, head, buffered
+                )
+            finally:
+                self.upstream_pool.release(target_host, target_port, upstream_socket, reusable)
         except Exception as exc:
             self.logger.error("Upstream error for %s: %s", target_host, exc)
             self._send_bad_gateway()
@@ -165,7 +270,7 @@ class ClientHandler:
 
         latency_ms = int((time.time() - start_time) * 1000)
         self.metrics_logger.log(
-            client_ip=self.client_address[0],
+            client_ip=self.client_ip,
             method=method,
             url=url,
             host=target_host,
@@ -175,7 +280,252 @@ class ClientHandler:
             blocked=0,
         )
 
-    def _handle_connect(self, request_bytes: bytes, method: str, url: str) -> None:
+    def _exchange_with_upstream(
+        self, target_host: str, target_port: int, request_parts: List[bytes], method: str
+    ) -> Tuple[socket.socket, bytes, bytes]:
+        """Send the request and read the response head, retrying once on a fresh
+        connection if a pooled one turns out to have been closed by the upstream.
+
+        Only idempotent requests go over pooled connections: a POST the upstream
+        processed before dropping the connection must not be sent twice, so it
+        is never put in a position where it would need a retry.
+        """
+        if method.upper() in _IDEMPOTENT_METHODS:
+            upstream_socket, reused = self.upstream_pool.acquire(target_host, target_port)
+        else:
+            upstream_socket, reused = self.upstream_pool.connect(target_host, target_port), False
+        while True:
+            try:
+                _send_buffers(upstream_socket, request_parts)
+                head, buffered = self._recv_response_head(upstream_socket)
+            except ConnectionError:
+                if not reused:
+                    upstream_socket.close()
+                    raise
+                head, buffered = b"", b""
+            except BaseException:
+                upstream_socket.close()
+                raise
+
+            if head:
+                return upstream_socket, head, buffered
+            upstream_socket.close()
+            if not reused:
+                raise ConnectionError("upstream closed the connection without responding")
+            upstream_socket = self.upstream_pool.connect(target_host, target_port)
+            reused = False
+
+    def _recv_response_head(
+        self, upstream_socket: socket.socket, buffered: bytes = b""
+    ) -> Tuple[bytes, bytes]:
+        """Read up to the end of a response head; return (head, bytes received after it).
+
+        An empty head means the upstream closed before sending anything.
+        """
+        buffer = bytearray(buffered)
+        while True:
+            header_end = buffer.find(b"\r\n\r\n")
+            if header_end != -1:
+                return bytes(buffer[: header_end + 4]), bytes(buffer[header_end + 4 :])
+            if len(buffer) > _MAX_HEADER_SIZE:
+                raise ValueError("upstream response head too large")
+            if _TCP_QUICKACK is not None:
+                # Keep-alive connections drop into delayed-ACK mode; ACK the
+                # upstream's first segment at once so a head written in several
+                # pieces is not held back by its Nagle algorithm.
+                upstream_socket.setsockopt(socket.IPPROTO_TCP, _TCP_QUICKACK, 1)
+            chunk = upstream_socket.recv(_IO_CHUNK_SIZE)
+            if not chunk:
+                if buffer:
+                    raise ValueError("upstream closed mid response head")
+                return b"", b""
+            buffer += chunk
+
+    def _relay_response(
+        self, upstream_socket: socket.socket, method: str, head: bytes, buffered: bytes
+    ) -> Tuple[int, bool]:
+        """Relay one response to the client.
+
+        Returns (bytes sent to the client, whether the upstream connection is
+        positioned exactly at the end of the response and may be reused).
+        """
+        sent = 0
+        version, status, headers = parse_http_response_head(head)
+        # Interim 1xx responses (e.g. 100 Continue) precede the final one.
+        while 100 <= status < 200 and status != 101:
+            self.client_socket.sendall(head)
+            sent += len(head)
+            head, buffered = self._recv_response_head(upstream_socket, buffered)
+            if not head:
+                raise ConnectionError("upstream closed after an interim response")
+            version, status, headers = parse_http_response_head(head)
+        if not status:
+            raise ValueError("malformed upstream response head")
+
+        keep_alive = response_allows_reuse(version, headers)
+        transfer_encoding = headers.get("transfer-encoding", "").lower()
+        content_length = headers.get("content-length")
+
+        if method.upper() == "HEAD" or status in (204, 304):
+            client_head = build_client_response_head(head)
+            self.client_socket.sendall(client_head)
+            return sent + len(client_head), keep_alive and not buffered
+
+        if "chunked" in transfer_encoding:
+            client_head = build_client_response_head(head)
+            self.client_socket.sendall(client_head)
+            body_sent, complete, leftover = self._relay_chunked(upstream_socket, buffered)
+            return sent + len(client_head) + body_sent, keep_alive and complete and not leftover
+
+        if content_length is not None and content_length.isdigit() and not transfer_encoding:
+            length = int(content_length)
+            client_head = build_client_response_head(head)
+            self.client_socket.sendall(client_head + buffered[:length])
+            body_sent = min(len(buffered), length)
+            if body_sent < length:
+                body_sent += self._relay(upstream_socket, self.client_socket, length - body_sent)
+            complete = body_sent == length and len(buffered) <= length
+            return sent + len(client_head) + body_sent, keep_alive and complete
+
+        # No framing: the body runs until the upstream closes the connection.
+        self.client_socket.sendall(head + buffered)
+        body_sent = self._relay(upstream_socket, self.client_socket)
+        return sent + len(head) + len(buffered) + body_sent, False
+
+    def _relay_chunked(
+        self, upstream_socket: socket.socket, buffered: bytes
+    ) -> Tuple[int, bool, bytes]:
+        """Relay a chunked body verbatim, following the chunk framing to find its end.
+
+        Returns (bytes sent, whether the terminating chunk was seen, bytes past the end).
+        """
+        buffer = bytearray(buffered)
+        sent = 0
+        while True:
+            line_end = buffer.find(b"\r\n")
+            while line_end == -1:
+                if len(buffer) > _MAX_HEADER_SIZE:
+                    raise ValueError("malformed chunk size line")
+                chunk = upstream_socket.recv(_IO_CHUNK_SIZE)
+                if not chunk:
+                    self.client_socket.sendall(buffer)
+                    return sent + len(buffer), False, b""
+                buffer += chunk
+                line_end = buffer.find(b"\r\n")
+
+            chunk_size = int(bytes(buffer[:line_end]).split(b";", 1)[0].strip(), 16)
+            if chunk_size == 0:
+                # Last chunk: optional trailer fields, then an empty line.
+                trailer_end = buffer.find(b"\r\n\r\n", line_end)
+                while trailer_end == -1:
+                    if len(buffer) > _MAX_HEADER_SIZE:
+                        raise ValueError("upstream chunked trailer too large")
+                    chunk = upstream_socket.recv(_IO_CHUNK_SIZE)
+                    if not chunk:
+                        self.client_socket.sendall(buffer)
+                        return sent + len(buffer), False, b""
+                    buffer += chunk
+                    trailer_end = buffer.find(b"\r\n\r\n", line_end)
+                self.client_socket.sendall(buffer[: trailer_end + 4])
+                return sent + trailer_end + 4, True, bytes(buffer[trailer_end + 4 :])
+
+            # Size line, chunk data and the CRLF that closes the chunk.
+            chunk_end = line_end + 2 + chunk_size + 2
+            if len(buffer) >= chunk_end:
+                self.client_socket.sendall(buffer[:chunk_end])
+                del buffer[:chunk_end]
+                sent += chunk_end
+                continue
+
+            self.client_socket.sendall(buffer)
+            sent += len(buffer)
+            remaining = chunk_end - len(buffer)
+            buffer.clear()
+            relayed = self._relay(upstream_socket, self.client_socket, remaining)
+            sent += relayed
+            if relayed < remaining:
+                return sent, False, b""
+
+    def _relay(self, src: socket.socket, dst: socket.socket, limit: Optional[int] = None) -> int:
+        """Copy bytes from src to dst until src closes or `limit` bytes have been
+        copied; return the byte count."""
+        if hasattr(os, "splice"):
+            return self._splice_relay(src, dst, limit)
+
+        # One reusable buffer for the whole relay rather than a bytes object per recv().
+        buffer = bytearray(_IO_CHUNK_SIZE)
+        view = memoryview(buffer)
+        total = 0
+        while limit is None or total < limit:
+            want = _IO_CHUNK_SIZE if limit is None else min(_IO_CHUNK_SIZE, limit - total)
+            received = src.recv_into(buffer, want)
+            if not received:
+                break
+            dst.sendall(view[:received])
+            total += received
+        return total
+
+    def _splice_relay(self, src: socket.socket, dst: socket.socket, limit: Optional[int]) -> int:
+        """Linux zero-copy relay: splice src -> pipe -> dst without entering user space."""
+        pipe_read, pipe_write, chunk_size = self._relay_pipe()
+        try:
+            total = 0
+            while limit is None or total < limit:
+                want = chunk_size if limit is None else min(chunk_size, limit - total)
+                moved = self._splice(src, src.fileno(), pipe_write, want, False, os.SPLICE_F_MOVE)
+                if not moved:
+                    break
+                total += moved
+                # With the remaining length known, tell TCP more data follows so
+                # it doesn't push a short segment at the end of every pipeful.
+                flags = os.SPLICE_F_MOVE
+                if limit is not None and total < limit:
+                    flags |= os.SPLICE_F_MORE
+                pending = moved
+                while pending:
+                    pending -= self._splice(dst, pipe_read, dst.fileno(), pending, True, flags)
+            return total
+        except BaseException:
+            # Bytes may be left stranded in the pipe; never reuse it.
+            self._close_relay_pipe()
+            raise
+
+    def _relay_pipe(self) -> Tuple[int, int, int]:
+        """The handler's splice pipe as (read fd, write fd, capacity), created on
+        first use and then kept for every later relay, e.g. each chunk of a
+        chunked response."""
+        if self._pipe is None:
+            pipe_read, pipe_write = os.pipe()
+            capacity = _IO_CHUNK_SIZE
+            if _F_SETPIPE_SZ is not None:
+                # A larger pipe lets each splice() pair move more than the
+                # default 64 KiB; unprivileged processes may be refused.
+                try:
+                    capacity = fcntl.fcntl(pipe_write, _F_SETPIPE_SZ, _SPLICE_PIPE_SIZE)
+                except OSError:
+                    pass
+            self._pipe = (pipe_read, pipe_write, capacity)
+        return self._pipe
+
+    def _close_relay_pipe(self) -> None:
+        if self._pipe is not None:
+            os.close(self._pipe[0])
+            os.close(self._pipe[1])
+            self._pipe = None
+
+    @staticmethod
+    def _splice(
+        sock: socket.socket, fd_in: int, fd_out: int, count: int, writing: bool, flags: int = 0
+    ) -> int:
+        """splice() honouring the socket timeout (sockets with a timeout are non-blocking)."""
+        while True:
+            try:
+                return os.splice(fd_in, fd_out, count, flags=flags)
+            except BlockingIOError:
+                if not wait_for_socket(sock, writing, sock.gettimeout()):
+                    raise socket.timeout("timed out")
+
+    def _handle_connect(self, request_size: int, method: str, url: str) -> None:
         """Handle HTTPS tunneling using HTTP CONNECT."""
         target_host, target_port = self._parse_connect_target(url)
         if not target_host or target_port <= 0:
@@ -193,11 +543,58 @@ class ClientHandler:
             return
 
         start_time = time.time()
-        request_size = len(request_bytes)
-        response_size = 0
+        try:
+            upstream_socket = self.upstream_pool.connect(target_host, target_port)
+        except Exception as exc:
+            self.logger.error("CONNECT upstream error for %s:%s: %s", target_host, target_port, exc)
+            self._send_bad_gateway()
+            return
+
+        tunnel_args = (
+            upstream_socket,
+            method,
+            url,
+            target_host,
+            target_port,
+            start_time,
+            request_size,
+        )
+        # A tunnel can stay open for as long as the client likes. Run it on a
+        # thread of its own so it doesn't hold one of the server's pooled
+        # workers; that thread then owns both sockets.
+        if _tunnel_slots.acquire(blocking=False):
+            try:
+                threading.Thread(
+                    target=self._run_detached_tunnel, args=tunnel_args, daemon=True
+                ).start()
+            except RuntimeError:
+                _tunnel_slots.release()
+            else:
+                self._tunnel_detached = True
+                return
+        # All tunnel threads are busy (or none could be started): keep this one
+        # on the worker, so the thread count stays bounded either way.
+        self._run_tunnel(*tunnel_args)
 
+    def _run_detached_tunnel(self, *tunnel_args) -> None:
         try:
-            with socket.create_connection((target_host, target_port), timeout=10) as upstream_socket:
+            self._run_tunnel(*tunnel_args)
+        finally:
+            _tunnel_slots.release()
+
+    def _run_tunnel(
+        self,
+        upstream_socket: socket.socket,
+        method: str,
+        url: str,
+        target_host: str,
+        target_port: int,
+        start_time: float,
+        request_size: int,
+    ) -> None:
+        """Confirm the tunnel to the client, relay it to completion, then log it."""
+        try:
+            with upstream_socket, self.client_socket:
                 self.client_socket.sendall(b"HTTP/1.1 200 Connection Established\r\n\r\n")
                 self.logger.info(
                     "Established CONNECT tunnel to %s:%s",
@@ -206,13 +603,12 @@ class ClientHandler:
                 )
                 response_size = self._tunnel_bidirectional(upstream_socket)
         except Exception as exc:
-            self.logger.error("CONNECT upstream error for %s:%s: %s", target_host, target_port, exc)
-            self._send_bad_gateway()
+            self.logger.error("CONNECT tunnel error for %s:%s: %s", target_host, target_port, exc)
             return
 
         latency_ms = int((time.time() - start_time) * 1000)
         self.metrics_logger.log(
-            client_ip=self.client_address[0],
+            client_ip=self.client_ip,
             method=method,
             url=url,
             host=target_host,
@@ -253,58 +649,42 @@ class ClientHandler:
     def _tunnel_bidirectional(self, upstream_socket: socket.socket) -> int:
         """Tunnel bytes between client and upstream until one side closes."""
         tunneled_from_upstream = 0
-        sockets = [self.client_socket, upstream_socket]
         self.client_socket.settimeout(None)
         upstream_socket.settimeout(None)
-
-        while True:
-            readable, _, _ = select.select(sockets, [], [], 30)
-            if not readable:
-                continue
-
-            for src in readable:
-                dst = upstream_socket if src is self.client_socket else self.client_socket
-                data = src.recv(4096)
-                if not data:
-                    return tunneled_from_upstream
-                dst.sendall(data)
-                if src is upstream_socket:
-                    tunneled_from_upstream += len(data)
+        buffer = bytearray(_IO_CHUNK_SIZE)
+        view = memoryview(buffer)
+
+        # Register both ends once for the tunnel's lifetime (epoll on Linux)
+        # instead of handing the fd set to select() on every iteration. Each key
+        # carries its peer and whether its bytes count as upstream traffic.
+        with selectors.DefaultSelector() as selector:
+            selector.register(self.client_socket, selectors.EVENT_READ, (upstream_socket, False))
+            selector.register(upstream_socket, selectors.EVENT_READ, (self.client_socket, True))
+
+            # No timeout: an idle tunnel sleeps until either side has data or closes.
+            while True:
+                for key, _ in selector.select():
+                    dst, from_upstream = key.data
+                    received = key.fileobj.recv_into(buffer)
+                    if not received:
+                        return tunneled_from_upstream
+                    dst.sendall(view[:received])
+                    if from_upstream:
+                        tunneled_from_upstream += received
 
     def _send_forbidden(self, host: str) -> None:
-        response = (
-            "HTTP/1.1 403 Forbidden\r\n"
-            "Content-Type: text/plain\r\n"
-            "Connection: close\r\n"
-            "\r\n"
-            f"Access to {host} is blocked by proxy policy."
-        )
-        self.client_socket.sendall(response.encode("utf-8"))
+        _send_buffers(self.client_socket, [_FORBIDDEN_HEAD, host.encode("utf-8"), _FORBIDDEN_TAIL])
 
     def _send_bad_request(self) -> None:
-        response = (
-            "HTTP/1.1 400 Bad Request\r\n"
-            "Content-Type: text/plain\r\n"
-            "Connection: close\r\n"
-            "\r\n"
-            "Malformed request received by proxy."
-        )
-        self.client_socket.sendall(response.encode("utf-8"))
+        self.client_socket.sendall(_BAD_REQUEST_RESPONSE)
 
     def _send_bad_gateway(self) -> None:
-        response = (
-            "HTTP/1.1 502 Bad Gateway\r\n"
-            "Content-Type: text/plain\r\n"
-            "Connection: close\r\n"
-            "\r\n"
-            "Proxy could not reach the upstream server."
-        )
-        self.client_socket.sendall(response.encode("utf-8"))
+        self.client_socket.sendall(_BAD_GATEWAY_RESPONSE)
 
     def _log_blocked_request(self, method: str, url: str, host: str) -> None:
         """Log blocked request to metrics."""
         self.metrics_logger.log(
-            client_ip=self.client_address[0],
+            client_ip=self.client_ip,
             method=method,
             url=url,
             host=host,
@@ -0,0 +1,45 @@
+"""TTL cache for upstream getaddrinfo() lookups."""
+
+import socket
+import threading
+import time
+from typing import Dict, Tuple
+
+
+class DNSCache:
+    """Caches getaddrinfo() results per (host, port) for `ttl` seconds.
+
+    Lookups for popular upstreams then skip the blocking resolver call (and the
+    DNS round trip behind it) on every request.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_entries: int = 1024) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (host, port) -> (monotonic expiry time, getaddrinfo() result)
+        self._entries: Dict[Tuple[str, int], Tuple[float, list]] = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, host: str, port: int) -> list:
+        """getaddrinfo() for a TCP upstream, served from the cache while fresh."""
+        key = (host, port)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        infos = socket.getaddrinfo(host, port, socket.AF_UNSPEC, socket.SOCK_STREAM)
+        with self._lock:
+            # Entries are kept in insertion order, which with a fixed TTL is also
+            # expiry order: the oldest, first to expire, is always at the front.
+            self._entries.pop(key, None)
+            while len(self._entries) >= self.max_entries:
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (now + self.ttl, infos)
+        return infos
+
+    def invalidate(self, host: str, port: int) -> None:
+        """Drop a cached result, e.g. after none of its addresses accepted a connection."""
+        with self._lock:
+            self._entries.pop((host, port), None)
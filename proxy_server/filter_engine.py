@@ -1,7 +1,8 @@
 """Domain and keyword-based content filtering logic."""
 
+import re
 from pathlib import Path
-from typing import List
+from typing import FrozenSet, List, Optional, Pattern, Tuple
 
 
 class FilterEngine:
@@ -11,6 +12,11 @@ class FilterEngine:
         self.blocked_domains_path = Path(blocked_domains_path)
         self.blocked_domains = self._load_blocked_domains()
         self.blocked_keywords: List[str] = ["adult", "malware", "phishing"]
+        # Normalized once here: exact hosts are a set lookup, subdomains a single
+        # C-level endswith() over every ".domain" suffix.
+        self._blocked_hosts, self._blocked_suffixes = self._index_domains(self.blocked_domains)
+        # Keywords are compiled into one alternation, checked in a single regex pass.
+        self._keyword_pattern = self._compile(self.blocked_keywords)
 
     def _load_blocked_domains(self) -> List[str]:
         if not self.blocked_domains_path.exists():
@@ -21,13 +27,23 @@ class FilterEngine:
             if line.strip() and not line.strip().startswith("#")
         ]
 
+    @staticmethod
+    def _index_domains(domains: List[str]) -> Tuple[FrozenSet[str], Tuple[str, ...]]:
+        """Return the lowercased domains and their ".domain" suffixes."""
+        hosts = frozenset(domain.lower() for domain in domains)
+        return hosts, tuple(f".{domain}" for domain in hosts)
+
+    @staticmethod
+    def _compile(keywords: List[str]) -> Optional[Pattern[str]]:
+        """Compile lowercased keywords into one pattern; None when there are none."""
+        if not keywords:
+            return None
+        return re.compile("|".join(re.escape(keyword.lower()) for keyword in keywords))
+
     def is_blocked(self, host: str, url: str) -> bool:
         host_lower = host.lower()
-        url_lower = url.lower()
-        for domain in self.blocked_domains:
-            if host_lower == domain.lower() or host_lower.endswith(f".{domain.lower()}"):
-                return True
-        for keyword in self.blocked_keywords:
-            if keyword in url_lower:
-                return True
+        if host_lower in self._blocked_hosts or host_lower.endswith(self._blocked_suffixes):
+            return True
+        if self._keyword_pattern is not None and self._keyword_pattern.search(url.lower()):
+            return True
         return False
@@ -1,40 +1,75 @@
 """Minimal HTTP parsing utilities for a raw TCP proxy."""
 
-from typing import Dict, Tuple
-from urllib.parse import urlsplit
+from typing import Dict, List, Optional, Tuple
 
+# Request headers in arrival order as (lowercased name, value, name as sent),
+# all raw bytes, so they can be forwarded without decoding and re-encoding.
+RequestHeaders = List[Tuple[bytes, bytes, bytes]]
 
-def parse_http_request(request_bytes: bytes) -> Tuple[Tuple[str, str, str], Dict[str, str], bytes]:
+# Hop-by-hop request headers describe the client's connection to the proxy and
+# are not forwarded. Transfer-Encoding is left alone: the body is passed on
+# exactly as received, so its framing must travel with it.
+_HOP_BY_HOP_HEADERS = frozenset(
+    {b"connection", b"proxy-connection", b"keep-alive", b"te", b"trailer", b"upgrade"}
+)
+
+
+def parse_http_request(request_bytes: bytes) -> Tuple[Tuple[str, str, str], RequestHeaders, bytes]:
     """Parse the request line and headers from raw bytes."""
     try:
         header_part, _, body = request_bytes.partition(b"\r\n\r\n")
-        lines = header_part.decode("iso-8859-1", errors="replace").split("\r\n")
-        request_line = lines[0].split(" ")
+        lines = header_part.split(b"\r\n")
+        request_line = lines[0].decode("iso-8859-1").split(" ")
         if len(request_line) != 3:
-            return (), {}, b""
+            return (), [], b""
         method, url, version = request_line
-        headers = {}
+        headers = []
         for line in lines[1:]:
-            if ":" in line:
-                key, value = line.split(":", 1)
-                headers[key.strip()] = value.strip()
+            name, separator, value = line.partition(b":")
+            if separator:
+                name = name.strip()
+                headers.append((name.lower(), value.strip(), name))
         return (method, url, version), headers, body
     except Exception:
-        return (), {}, b""
+        return (), [], b""
+
+
+def get_header(headers: RequestHeaders, name: bytes) -> str:
+    """Value of the first header called `name` (lowercase), or "" if absent."""
+    for name_lc, value, _ in headers:
+        if name_lc == name:
+            return value.decode("iso-8859-1")
+    return ""
+
+
+def has_header(headers: RequestHeaders, name: bytes) -> bool:
+    """Whether a header called `name` (lowercase) is present, even with an empty value."""
+    return any(name_lc == name for name_lc, _, _ in headers)
 
 
-def parse_target_from_request(url: str, headers: Dict[str, str]) -> Tuple[str, int, str]:
+def parse_content_length(headers: RequestHeaders) -> Optional[int]:
+    """The request body length, 0 without a Content-Length header, or None if it is
+    ambiguous: repeated, or not a plain run of digits.
+
+    Upstreams disagree on which of several Content-Length headers wins, so
+    forwarding such a request could make the upstream see a different body, and
+    an unfiltered request after it, than the proxy did.
+    """
+    values = [value for name_lc, value, _ in headers if name_lc == b"content-length"]
+    if not values:
+        return 0
+    if len(values) > 1 or not values[0].isdigit():
+        return None
+    return int(values[0])
+
+
+def parse_target_from_request(url: str, headers: RequestHeaders) -> Tuple[str, int, str]:
     """Extract target host, port, and path from request URL and headers."""
-    if url.startswith("http://") or url.startswith("https://"):
-        parsed = urlsplit(url)
-        host = parsed.hostname or ""
-        port = parsed.port or (443 if parsed.scheme == "https" else 80)
-        path = parsed.path or "/"
-        if parsed.query:
-            path = f"{path}?{parsed.query}"
-        return host, port, path
-
-    host_header = headers.get("Host", "")
+    # Schemes are case-insensitive (RFC 3986, section 3.1).
+    if url[:8].lower().startswith(("http://", "https://")):
+        return _split_absolute_url(url)
+
+    host_header = get_header(headers, b"host")
     if not host_header:
         return "", 0, ""
     if ":" in host_header:
@@ -50,18 +85,109 @@ def parse_target_from_request(url: str, headers: Dict[str, str]) -> Tuple[str, i
     return host, port, path
 
 
+def _split_absolute_url(url: str) -> Tuple[str, int, str]:
+    """Split an absolute http(s) URL into (host, port, origin-form path).
+
+    A direct scan for the authority, equivalent to urlsplit() for this purpose
+    (host lowercased, brackets removed from IPv6 literals, fragment dropped)
+    without building a SplitResult on every request. Returns ("", 0, "") when the
+    authority is malformed.
+    """
+    scheme, _, rest = url.partition("://")
+    authority_end = len(rest)
+    for delimiter in "/?#":
+        index = rest.find(delimiter, 0, authority_end)
+        if index != -1:
+            authority_end = index
+    authority = rest[:authority_end].rpartition("@")[2]
+    path, _, query = rest[authority_end:].partition("#")[0].partition("?")
+    path = path or "/"
+    if query:
+        path = f"{path}?{query}"
+
+    if authority.startswith("["):
+        host, bracket, port_part = authority[1:].partition("]")
+        if not bracket or (port_part and not port_part.startswith(":")):
+            return "", 0, ""
+        port_str = port_part[1:]
+    else:
+        host, _, port_str = authority.partition(":")
+
+    if not port_str:
+        port = 443 if scheme.lower() == "https" else 80
+    # isascii() too: isdigit() accepts characters such as "²" that int() rejects.
+    elif port_str.isascii() and port_str.isdigit() and int(port_str) <= 65535:
+        port = int(port_str)
+    else:
+        return "", 0, ""
+    return host.lower(), port, path
+
+
 def build_forward_request(
     method: str,
     path: str,
     version: str,
-    headers: Dict[str, str],
+    headers: RequestHeaders,
     body: bytes,
-) -> bytes:
-    """Build an origin-form HTTP/1.1 request to send to the upstream server."""
-    forward_headers = {
-        key: value for key, value in headers.items() if key.lower() not in {"proxy-connection"}
-    }
-    forward_headers["Connection"] = "close"
-    request_line = f"{method} {path} {version}\r\n"
-    header_lines = "".join(f"{key}: {value}\r\n" for key, value in forward_headers.items())
-    return (request_line + header_lines + "\r\n").encode("iso-8859-1") + body
+) -> List[bytes]:
+    """Build an origin-form HTTP/1.1 request to send to the upstream server.
+
+    Returned as [head, body] fragments for a gathering send, so the body is
+    never copied into a joined request.
+    """
+    # Headers named in Connection are hop-by-hop for this request as well.
+    dropped = _HOP_BY_HOP_HEADERS
+    for name_lc, value, _ in headers:
+        if name_lc == b"connection":
+            dropped = dropped.union(token.strip().lower() for token in value.split(b","))
+    head = [f"{method} {path} {version}\r\n".encode("iso-8859-1")]
+    head.extend(
+        name + b": " + value + b"\r\n"
+        for name_lc, value, name in headers
+        if name_lc not in dropped
+    )
+    # Ask the upstream to keep the connection open so it can be pooled and reused.
+    head.append(b"Connection: keep-alive\r\n\r\n")
+    return [b"".join(head), body]
+
+
+def parse_http_response_head(head_bytes: bytes) -> Tuple[str, int, Dict[str, str]]:
+    """Parse an upstream status line and headers; header names are lowercased."""
+    try:
+        lines = head_bytes.decode("iso-8859-1", errors="replace").split("\r\n")
+        status_line = lines[0].split(" ", 2)
+        if len(status_line) < 2 or not status_line[0].startswith("HTTP/"):
+            return "", 0, {}
+        version = status_line[0]
+        status = int(status_line[1])
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                key, value = line.split(":", 1)
+                headers[key.strip().lower()] = value.strip()
+        return version, status, headers
+    except Exception:
+        return "", 0, {}
+
+
+def response_allows_reuse(version: str, headers: Dict[str, str]) -> bool:
+    """Whether the upstream will keep the connection open after this response."""
+    tokens = {token.strip().lower() for token in headers.get("connection", "").split(",")}
+    if version == "HTTP/1.0":
+        return "keep-alive" in tokens
+    return "close" not in tokens
+
+
+def build_client_response_head(head_bytes: bytes) -> bytes:
+    """Rewrite an upstream response head for the client, whose connection closes after it.
+
+    Header lines are kept verbatim (so repeated headers such as Set-Cookie survive);
+    only the connection-scoped Connection/Keep-Alive headers are replaced.
+    """
+    lines = head_bytes.split(b"\r\n")
+    kept = [
+        line
+        for line in lines[1:]
+        if line and line.split(b":", 1)[0].strip().lower() not in {b"connection", b"keep-alive"}
+    ]
+    return b"\r\n".join([lines[0], *kept, b"Connection: close", b"", b""])
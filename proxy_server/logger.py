@@ -1,6 +1,9 @@
 """Logging utilities for access and error logs."""
 
+import atexit
 import logging
+import logging.handlers
+import queue
 from pathlib import Path
 from typing import Optional
 
@@ -35,9 +38,19 @@ class ProxyLogger:
             stream_handler.setLevel(logging.INFO)
             stream_handler.setFormatter(formatter)
 
-            self.logger.addHandler(access_handler)
-            self.logger.addHandler(error_handler)
-            self.logger.addHandler(stream_handler)
+            # Request threads only enqueue records; a listener thread formats them
+            # and does the file/console writes.
+            log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(
+                log_queue,
+                access_handler,
+                error_handler,
+                stream_handler,
+                respect_handler_level=True,
+            )
+            listener.start()
+            atexit.register(listener.stop)
+            self.logger.addHandler(logging.handlers.QueueHandler(log_queue))
 
     def info(self, message: str, *args: Optional[object]) -> None:
         self.logger.info(message, *args)
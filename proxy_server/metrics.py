@@ -1,14 +1,50 @@
 """Metrics logging for proxy performance monitoring."""
 
+import atexit
 import csv
+import logging
+import os
 import threading
 import time
+from collections import deque
 from pathlib import Path
-from typing import List
+from typing import Deque, List
+
+# Rows are written in binary through a raw descriptor held open for appends.
+# O_APPEND makes every write land at the current end of file, so no lock is
+# needed around it.
+_APPEND_FLAGS = (
+    os.O_WRONLY
+    | os.O_APPEND
+    | os.O_CREAT
+    | getattr(os, "O_BINARY", 0)
+    | getattr(os, "O_CLOEXEC", 0)
+)
+
+# The proxy's logger; write failures are reported there and retried.
+_logger = logging.getLogger("proxy")
+
+
+def _csv_field(value: str) -> bytes:
+    """Encode a text field, quoted the way csv.writer would if it needs it."""
+    if '"' in value or "," in value or "\n" in value or "\r" in value:
+        value = '"' + value.replace('"', '""') + '"'
+    return value.encode("utf-8")
 
 
 class MetricsLogger:
-    """Append per-request metrics to a CSV file."""
+    """Append per-request metrics to a CSV file.
+
+    log() only appends the row to an in-memory ring; a background writer thread
+    flushes it every FLUSH_INTERVAL seconds (sooner once BATCH_SIZE rows are
+    waiting), appending up to BATCH_SIZE rows per write, which keeps file I/O off
+    the request path. If the writer falls MAX_PENDING rows behind, the oldest
+    unwritten rows are dropped rather than letting memory grow without bound.
+    """
+
+    FLUSH_INTERVAL = 0.1
+    BATCH_SIZE = 1000
+    MAX_PENDING = 100000
 
     FIELDNAMES = [
         "timestamp",
@@ -25,46 +61,55 @@ class MetricsLogger:
     def __init__(self, metrics_path: str) -> None:
         self.metrics_path = Path(metrics_path)
         self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
-        self._lock = threading.Lock()
         self._ensure_header()
+        self._fd = os.open(self.metrics_path, _APPEND_FLAGS, 0o644)
+        self._pending: Deque[list] = deque(maxlen=self.MAX_PENDING)
+        self._wakeup = threading.Event()
+        self._closing = False
+        self._write_failing = False
+        # (epoch second, its formatted timestamp), shared by every row logged in
+        # that second.
+        self._timestamp_cache = (0, b"")
+        self._writer_thread = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer_thread.start()
+        atexit.register(self.close)
 
     def _ensure_header(self) -> None:
-        with self._lock:
-            if not self.metrics_path.exists():
-                with self.metrics_path.open("w", newline="") as csv_file:
-                    writer = csv.writer(csv_file)
-                    writer.writerow(self.FIELDNAMES)
-                return
+        if not self.metrics_path.exists():
+            with self.metrics_path.open("w", newline="") as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(self.FIELDNAMES)
+            return
 
-            with self.metrics_path.open("r", newline="") as csv_file:
-                rows = list(csv.reader(csv_file))
+        with self.metrics_path.open("r", newline="") as csv_file:
+            rows = list(csv.reader(csv_file))
 
-            existing_header: List[str] = rows[0] if rows else []
-            if existing_header == self.FIELDNAMES:
-                return
+        existing_header: List[str] = rows[0] if rows else []
+        if existing_header == self.FIELDNAMES:
+            return
 
-            data_rows = rows[1:] if rows else []
-            old_index = {name: idx for idx, name in enumerate(existing_header)}
-            normalized_rows = []
-            for row in data_rows:
-                normalized_row = []
-                for field in self.FIELDNAMES:
-                    if field in old_index and old_index[field] < len(row):
-                        normalized_row.append(row[old_index[field]])
-                    elif field == "blocked":
-                        normalized_row.append("0")
-                    else:
-                        normalized_row.append("")
-                normalized_rows.append(normalized_row)
+        data_rows = rows[1:] if rows else []
+        old_index = {name: idx for idx, name in enumerate(existing_header)}
+        normalized_rows = []
+        for row in data_rows:
+            normalized_row = []
+            for field in self.FIELDNAMES:
+                if field in old_index and old_index[field] < len(row):
+                    normalized_row.append(row[old_index[field]])
+                elif field == "blocked":
+                    normalized_row.append("0")
+                else:
+                    normalized_row.append("")
+            normalized_rows.append(normalized_row)
 
-            with self.metrics_path.open("w", newline="") as csv_file:
-                writer = csv.writer(csv_file)
-                writer.writerow(self.FIELDNAMES)
-                writer.writerows(normalized_rows)
+        with self.metrics_path.open("w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(self.FIELDNAMES)
+            writer.writerows(normalized_rows)
 
     def log(
         self,
-        client_ip: str,
+        client_ip: bytes,
         method: str,
         url: str,
         host: str,
@@ -73,20 +118,107 @@ class MetricsLogger:
         response_bytes: int,
         blocked: int = 0,
     ) -> None:
-        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
-        with self._lock:
-            with self.metrics_path.open("a", newline="") as csv_file:
-                writer = csv.writer(csv_file)
-                writer.writerow(
-                    [
-                        timestamp,
-                        client_ip,
-                        method,
-                        url,
-                        host,
-                        latency_ms,
-                        request_bytes,
-                        response_bytes,
-                        blocked,
-                    ]
-                )
+        now = int(time.time())
+        second, timestamp = self._timestamp_cache
+        if now != second:
+            timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now)).encode("ascii")
+            self._timestamp_cache = (now, timestamp)
+        self._pending.append(
+            [
+                timestamp,
+                client_ip,
+                method,
+                url,
+                host,
+                latency_ms,
+                request_bytes,
+                response_bytes,
+                blocked,
+            ]
+        )
+        if len(self._pending) >= self.BATCH_SIZE:
+            self._wakeup.set()
+
+    def close(self) -> None:
+        """Write out any pending rows and stop the writer thread."""
+        if self._writer_thread.is_alive():
+            self._closing = True
+            self._wakeup.set()
+            self._writer_thread.join(timeout=5)
+            if not self._writer_thread.is_alive():
+                os.close(self._fd)
+
+    def _write_loop(self) -> None:
+        pending = self._pending
+        while True:
+            self._wakeup.wait(self.FLUSH_INTERVAL)
+            self._wakeup.clear()
+            closing = self._closing
+            try:
+                if pending:
+                    self._reopen_if_replaced()
+                while pending:
+                    rows = []
+                    try:
+                        while len(rows) < self.BATCH_SIZE:
+                            rows.append(pending.popleft())
+                    except IndexError:
+                        pass
+                    try:
+                        self._write_rows(rows)
+                    except OSError:
+                        # Put the batch back to be retried on the next tick.
+                        pending.extendleft(reversed(rows))
+                        raise
+            except OSError as exc:
+                # Reported once per outage rather than on every tick.
+                if not self._write_failing:
+                    _logger.error("Metrics write to %s failed: %s", self.metrics_path, exc)
+                    self._write_failing = True
+            else:
+                if self._write_failing:
+                    _logger.info("Metrics writes to %s resumed", self.metrics_path)
+                    self._write_failing = False
+            if closing:
+                return
+
+    def _reopen_if_replaced(self) -> None:
+        """Reopen the metrics file if the path no longer names the file held open,
+        e.g. after it was rotated away or deleted, so rows stay visible at the path."""
+        held = os.fstat(self._fd)
+        try:
+            current = os.stat(self.metrics_path)
+        except FileNotFoundError:
+            pass
+        else:
+            if (current.st_ino, current.st_dev) == (held.st_ino, held.st_dev):
+                return
+
+        self.metrics_path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.metrics_path, _APPEND_FLAGS, 0o644)
+        os.close(self._fd)
+        self._fd = fd
+        if os.fstat(fd).st_size == 0:
+            os.write(fd, ",".join(self.FIELDNAMES).encode("ascii") + b"\r\n")
+
+    def _write_rows(self, rows: List[list]) -> None:
+        """Append rows in one write(), formatted straight to CSV bytes.
+
+        Only the free-text fields can need quoting; the numeric columns are
+        formatted with %d, and the timestamp and client IP arrive as bytes.
+        """
+        if not rows:
+            return
+        data = bytearray()
+        for timestamp, client_ip, method, url, host, *numbers in rows:
+            data += b"%b,%b,%b,%b,%b,%d,%d,%d,%d\r\n" % (
+                timestamp,
+                client_ip,
+                _csv_field(method),
+                _csv_field(url),
+                _csv_field(host),
+                *numbers,
+            )
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._fd, view) :]
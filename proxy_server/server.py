@@ -1,17 +1,29 @@
 """Proxy server that accepts connections and delegates to client handlers."""
 
+import os
+import queue
 import socket
 import threading
 from typing import Tuple
 
 from client_handler import ClientHandler
+from dns_cache import DNSCache
 from filter_engine import FilterEngine
 from logger import ProxyLogger
 from metrics import MetricsLogger
+from upstream_pool import UpstreamPool
+
+# Stack reserved per connection thread. Handlers only run shallow, non-recursive
+# code, so the platform default (typically 8 MiB) is far more than needed.
+_WORKER_STACK_SIZE = 512 * 1024
+# Requests handled at once. Established CONNECT tunnels move to threads of
+# their own (up to client_handler._MAX_TUNNEL_THREADS), so long-lived tunnels
+# don't count against this.
+_MAX_WORKERS = max(256, (os.cpu_count() or 1) * 32)
 
 
 class ProxyServer:
-    """TCP listener that spawns a thread per incoming client connection."""
+    """TCP listener that hands each client connection to a fixed pool of worker threads."""
 
     def __init__(
         self,
@@ -32,9 +44,19 @@ class ProxyServer:
         self.filter_engine = FilterEngine(self.blocked_domains_path)
         self.metrics_logger = MetricsLogger(self.metrics_path)
         self.logger = ProxyLogger(self.access_log_path, self.error_log_path)
+        self.dns_cache = DNSCache()
+        self.upstream_pool = UpstreamPool(self.dns_cache)
+        self._connections: "queue.SimpleQueue[ClientHandler]" = queue.SimpleQueue()
+        self._worker_slots = threading.BoundedSemaphore(_MAX_WORKERS)
 
     def start(self) -> None:
         """Start the TCP listener and accept clients forever."""
+        threading.stack_size(_WORKER_STACK_SIZE)
+        # Workers are daemon threads so open tunnels never hold up shutdown.
+        for index in range(_MAX_WORKERS):
+            threading.Thread(
+                target=self._worker_loop, name=f"proxy-worker-{index}", daemon=True
+            ).start()
         with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as server_socket:
             server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             server_socket.bind((self.host, self.port))
@@ -44,21 +66,36 @@ class ProxyServer:
             )
 
             while not self._shutdown_event.is_set():
+                # Only accept once a worker is free, so connections beyond the
+                # pool's capacity wait in the listen backlog rather than in memory.
+                self._worker_slots.acquire()
                 try:
                     client_socket, client_addr = server_socket.accept()
                 except OSError as exc:
+                    self._worker_slots.release()
                     self.logger.error("Accept failed: %s", exc)
                     continue
 
                 handler = ClientHandler(
                     client_socket=client_socket,
                     client_address=client_addr,
+                    # Encoded once here; metrics rows carry the address as bytes.
+                    client_ip=client_addr[0].encode("ascii"),
                     filter_engine=self.filter_engine,
                     metrics_logger=self.metrics_logger,
                     logger=self.logger,
+                    upstream_pool=self.upstream_pool,
                 )
-                thread = threading.Thread(target=handler.handle, daemon=True)
-                thread.start()
+                self._connections.put(handler)
+
+    def _worker_loop(self) -> None:
+        """Handle queued connections one at a time, for the life of the process."""
+        while True:
+            handler = self._connections.get()
+            try:
+                handler.handle()
+            finally:
+                self._worker_slots.release()
 
     def stop(self) -> None:
         self._shutdown_event.set()
@@ -0,0 +1,21 @@
+"""Readiness waits on sockets, without select()'s descriptor limit."""
+
+import select
+import socket
+from typing import Optional
+
+
+def wait_for_socket(sock: socket.socket, writing: bool, timeout: Optional[float]) -> bool:
+    """Wait until `sock` is writable, or readable (data or EOF pending) when not
+    `writing`; return False if `timeout` seconds pass first (None waits forever).
+
+    Uses poll() where available: select() rejects descriptors numbered at or
+    above FD_SETSIZE (1024), which a busy proxy easily reaches.
+    """
+    if hasattr(select, "poll"):
+        poller = select.poll()
+        poller.register(sock, select.POLLOUT if writing else select.POLLIN)
+        return bool(poller.poll(None if timeout is None else int(timeout * 1000)))
+    if writing:
+        return bool(select.select([], [sock], [], timeout)[1])
+    return bool(select.select([sock], [], [], timeout)[0])
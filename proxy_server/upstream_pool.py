@@ -0,0 +1,104 @@
+"""Keep-alive pool of idle upstream connections, keyed by (host, port)."""
+
+import socket
+import threading
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+from dns_cache import DNSCache
+from socket_wait import wait_for_socket
+
+# Linux only: give up on an upstream whose sent data stays unacknowledged this
+# long (milliseconds), rather than waiting out the kernel's retransmission limit.
+_TCP_USER_TIMEOUT = getattr(socket, "TCP_USER_TIMEOUT", None)
+_USER_TIMEOUT_MS = 10000
+
+
+class UpstreamPool:
+    """Hands out upstream connections, reusing idle keep-alive ones where possible.
+
+    Idle connections are kept per (host, port), oldest first, each with the
+    monotonic time it was returned; a background thread closes those idle for
+    longer than `idle_timeout`.
+    """
+
+    def __init__(
+        self, dns_cache: DNSCache, max_idle_per_host: int = 8, idle_timeout: float = 30.0
+    ) -> None:
+        self.dns_cache = dns_cache
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self._idle: Dict[Tuple[str, int], Deque[Tuple[socket.socket, float]]] = {}
+        self._lock = threading.Lock()
+        self._reaper_started = False
+
+    def connect(self, host: str, port: int) -> socket.socket:
+        """Open a new connection; like socket.create_connection(), but resolving
+        through the DNS cache."""
+        last_error: Optional[OSError] = None
+        for family, sock_type, proto, _, sockaddr in self.dns_cache.resolve(host, port):
+            sock = socket.socket(family, sock_type, proto)
+            try:
+                sock.settimeout(10)
+                # Requests and response heads are small writes that Nagle would
+                # hold back; keepalive probes notice pooled connections that died.
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+                if _TCP_USER_TIMEOUT is not None:
+                    sock.setsockopt(socket.IPPROTO_TCP, _TCP_USER_TIMEOUT, _USER_TIMEOUT_MS)
+                sock.connect(sockaddr)
+                return sock
+            except OSError as exc:
+                sock.close()
+                last_error = exc
+
+        # None of the cached addresses worked; resolve afresh next time.
+        self.dns_cache.invalidate(host, port)
+        raise last_error or OSError(f"no addresses found for {host}")
+
+    def acquire(self, host: str, port: int) -> Tuple[socket.socket, bool]:
+        """Return (socket, reused): a live idle pooled connection if any, else a new one."""
+        while True:
+            with self._lock:
+                idle = self._idle.get((host, port))
+                entry = idle.pop() if idle else None
+            if entry is None:
+                return self.connect(host, port), False
+
+            sock, idle_since = entry
+            # A pooled socket that is readable has been closed (or spoken to) by
+            # the upstream while idle and can't carry a new request.
+            fresh = time.monotonic() - idle_since < self.idle_timeout
+            if fresh and not wait_for_socket(sock, False, 0):
+                return sock, True
+            sock.close()
+
+    def release(self, host: str, port: int, sock: socket.socket, reusable: bool) -> None:
+        """Return a connection to the pool if its last response was fully read,
+        otherwise close it."""
+        if reusable:
+            with self._lock:
+                idle = self._idle.setdefault((host, port), deque())
+                if len(idle) < self.max_idle_per_host:
+                    idle.append((sock, time.monotonic()))
+                    if not self._reaper_started:
+                        threading.Thread(target=self._reap_idle, daemon=True).start()
+                        self._reaper_started = True
+                    return
+        sock.close()
+
+    def _reap_idle(self) -> None:
+        """Background loop closing pooled connections idle for longer than the timeout."""
+        while True:
+            time.sleep(self.idle_timeout / 2)
+            deadline = time.monotonic() - self.idle_timeout
+            expired: List[socket.socket] = []
+            with self._lock:
+                for key, idle in list(self._idle.items()):
+                    while idle and idle[0][1] < deadline:
+                        expired.append(idle.popleft()[0])
+                    if not idle:
+                        del self._idle[key]
+            for sock in expired:
+                sock.close()